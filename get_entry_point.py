@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 import time
 import json
 import gzip
@@ -15,7 +16,9 @@ from dotenv import load_dotenv
 from datetime import time as dtime
 
 # ✅ EXISTING IMPORT (UNCHANGED)
-from get_option import get_option_id
+from get_option import get_option_id, get_option_ids_bulk
+from records import InstrumentRef, ContractChain
+from quote_history import append_snapshot, MongoStore, HISTORY_COLLECTION
 
 RUN_TIME = dtime(9, 15)
 TIMEZONE = pytz.timezone("Asia/Kolkata")
@@ -54,6 +57,9 @@ STRIKE_WINDOW_POINTS = {
 # ✅ EXPIRY LIMIT (ADDED – REQUIRED)
 MAX_EXPIRY_DAYS_AHEAD = 45
 
+# ✅ INTRADAY HISTORY (append-only frames in Mongo, see quote_history.py)
+SAVE_QUOTE_HISTORY = True
+
 INDEX_URL = "https://groww.in/v1/api/stocks_data/v1/tr_live_delayed/segment/CASH/latest_aggregated"
 MAX_RETRIES = 3
 RETRY_DELAY = 2
@@ -129,10 +135,10 @@ def load_upstox_symbol_map():
     for row in data:
         ts = row.get("trading_symbol")
         if ts:
-            out[ts] = {
-                "instrument_key": row.get("instrument_key"),
-                "exchange_token": row.get("exchange_token")
-            }
+            out[sys.intern(ts)] = InstrumentRef(
+                row.get("instrument_key"),
+                row.get("exchange_token")
+            )
 
     print(f"✅ Upstox symbols loaded: {len(out)}")
     return out
@@ -256,15 +262,25 @@ def extract_strikes(expiry_url: str) -> List[int]:
         if re.fullmatch(r"\d{1,3}(,\d{3})+", t)
     })
 
+# =====================================================
+# TRADING SYMBOL HELPERS
+# =====================================================
+def expiry_label(expiry_key: str) -> str:
+    """
+    2026-01-27
+    -> 27 JAN 26
+    """
+    year, month, day = expiry_key.split("-")
+    mon = list(MONTH_MAP.keys())[list(MONTH_MAP.values()).index(month)]
+    return f"{day} {mon} {year[-2:]}"
+
 def build_trading_symbol(symbol: str, expiry_key: str) -> str:
     """
     BANKNIFTY26JAN60000CE
     -> BANKNIFTY 60000 CE 27 JAN 26
     """
     try:
-        year, month, day = expiry_key.split("-")
-        mon = list(MONTH_MAP.keys())[list(MONTH_MAP.values()).index(month)]
-        yy = year[-2:]
+        label = expiry_label(expiry_key)
 
         # Extract parts
         m = re.match(r"([A-Z]+)(\d{2}[A-Z]{3})(\d+)(CE|PE)", symbol)
@@ -273,46 +289,68 @@ def build_trading_symbol(symbol: str, expiry_key: str) -> str:
 
         underlying, expiry_part, strike, opt_type = m.groups()
 
-        return f"{underlying} {strike} {opt_type} {day} {mon} {yy}"
+        return f"{underlying} {strike} {opt_type} {label}"
 
     except Exception:
         return None
 
+def build_expiry_query(underlying: str, expiry_key: str) -> str:
+    """
+    NIFTY, 2026-01-27
+    -> NIFTY 27 JAN 26
+    """
+    return f"{underlying} {expiry_label(expiry_key)}"
+
 
 # =====================================================
-# SYMBOL BUILDER (UNCHANGED)
+# SYMBOL BUILDER
 # =====================================================
 def build_symbols(underlying, exp, expiry_key, strikes):
-    out = []
+    out = ContractChain()
 
-    for s in strikes:
-        for opt_type in ("CE", "PE"):
-            try:
-                symbol = f"{underlying}{exp}{s}{opt_type}"
-                ts = build_trading_symbol(symbol, expiry_key)
-                ref = UPSTOX_SYMBOL_MAP.get(ts, {})
-
-                opt = get_option_id(ts) if ts else None
-                option_id = opt.get("id") if opt else None
-
-                dh, dl,open_value,close_value, mo = fetch_day_high_low(option_id)
-
-                out.append({
-                    "id": option_id,
-                    "open":open_value,
-                    "close":close_value,
-                    "title": opt.get("title") if opt else None,
-                    "trading_symbol": ts,
-                    "option_type": opt_type,
-                    "day_high": dh,
-                    "day_low": dl,
-                    "market_open": mo,
-                    "instrument_key": ref.get("instrument_key"),
-                    "exchange_token": ref.get("exchange_token")
-                })
+    contracts = [
+        (s, opt_type, build_trading_symbol(f"{underlying}{exp}{s}{opt_type}", expiry_key))
+        for s in strikes
+        for opt_type in ("CE", "PE")
+    ]
 
-            except Exception as e:
-                print(f"❌ Symbol build failed {underlying} {s}{opt_type}: {e}")
+    # 🔎 Resolve the whole expiry in a few paged searches
+    try:
+        bulk_ids = get_option_ids_bulk(
+            build_expiry_query(underlying, expiry_key),
+            [ts for _, _, ts in contracts if ts]
+        )
+    except Exception as e:
+        print(f"⚠️ Bulk id lookup failed {underlying} {expiry_key}: {e}")
+        bulk_ids = {}
+
+    for s, opt_type, ts in contracts:
+        try:
+            ref = UPSTOX_SYMBOL_MAP.get(ts)
+
+            opt = bulk_ids.get(ts)
+            if opt is None and ts:
+                opt = get_option_id(ts)
+            option_id = opt.get("id") if opt else None
+
+            dh, dl,open_value,close_value, mo = fetch_day_high_low(option_id)
+
+            out.append(
+                id=option_id,
+                open=open_value,
+                close=close_value,
+                title=opt.get("title") if opt else None,
+                trading_symbol=ts,
+                option_type=opt_type,
+                day_high=dh,
+                day_low=dl,
+                market_open=mo,
+                instrument_key=ref.instrument_key if ref else None,
+                exchange_token=ref.exchange_token if ref else None
+            )
+
+        except Exception as e:
+            print(f"❌ Symbol build failed {underlying} {s}{opt_type}: {e}")
 
     return out
 
@@ -340,7 +378,7 @@ def build_symbols_threaded(tasks, max_workers=30):
                 results[(t["underlying"], t["expiry_key"])] = future.result()
             except Exception as e:
                 print(f"❌ Thread failed {t['underlying']} {t['expiry_key']}: {e}")
-                results[(t["underlying"], t["expiry_key"])] = []
+                results[(t["underlying"], t["expiry_key"])] = ContractChain()
 
     return results
 
@@ -353,6 +391,7 @@ def process_symbols():
 
     client = MongoClient(MONGO_URL)
     col = client[DB_NAME][COLLECTION_NAME]
+    history_store = MongoStore(client[DB_NAME][HISTORY_COLLECTION]) if SAVE_QUOTE_HISTORY else None
 
     final = {}
     tasks = []
@@ -401,13 +440,20 @@ def process_symbols():
 
     for t in tasks:
         key = (t["underlying"], t["expiry_key"])
-        symbols = symbol_results.get(key, [])
+        symbols = symbol_results.get(key)
+        if symbols and SAVE_QUOTE_HISTORY:
+            try:
+                append_snapshot(t["underlying"], t["expiry_key"], symbols, now,
+                                store=history_store)
+            except Exception as e:
+                print(f"⚠️ History append failed {t['underlying']} {t['expiry_key']}: {e}")
         if symbols:
             final[t["underlying"]][t["expiry_key"]] = {
                 "atm": t["atm"],
                 "spot": t["spot"],
                 "strike_step": t["step"],
-                "symbols": symbols
+                # 🔁 compact chain → dict shape only at the Mongo boundary
+                "symbols": symbols.to_dicts()
             }
 
     col.update_one(
@@ -2,6 +2,7 @@ import re
 from datetime import datetime
 import pytz
 from downlaod_data import fetch_and_merge_mis
+from records import OptionInstrument
 IST = pytz.timezone("Asia/Kolkata")
 
 # ==========================================
@@ -33,6 +34,22 @@ def parse_option_symbol(symbol: str):
     }
 
 
+# ==========================================
+# COMPACT INSTRUMENT ROWS
+# ==========================================
+def compact_option_instruments(rows: list) -> list:
+    """
+    Keep only option rows, as slotted OptionInstrument records
+    (the raw master row dicts can be dropped afterwards).
+    """
+    out = []
+    for row in rows:
+        inst = OptionInstrument.from_row(row)
+        if inst is not None:
+            out.append(inst)
+    return out
+
+
 # ==========================================
 # FIND INSTRUMENT KEY
 # ==========================================
@@ -40,21 +57,18 @@ def find_option_instrument_key(instruments: list, option_symbol: str):
     parsed = parse_option_symbol(option_symbol)
 
     for inst in instruments:
-        try:
-            if (
-                inst.get("underlying_symbol") == parsed["underlying"]
-                and inst.get("instrument_type") == parsed["instrument_type"]
-                and float(inst.get("strike_price", -1)) == parsed["strike_price"]
-                and abs(inst.get("expiry", 0) - parsed["expiry_epoch"]) < 86_400_000
-            ):
-                return inst["instrument_key"], inst
-        except Exception:
-            continue
+        if (
+            inst.underlying_symbol == parsed["underlying"]
+            and inst.instrument_type == parsed["instrument_type"]
+            and inst.strike_price == parsed["strike_price"]
+            and abs(inst.expiry - parsed["expiry_epoch"]) < 86_400_000
+        ):
+            return inst.instrument_key, inst
 
     return None, None
 
 if __name__ == "__main__":
-    data = fetch_and_merge_mis()
+    data = compact_option_instruments(fetch_and_merge_mis())
 
     symbol = "NIFTY26JAN24350CE"
 
@@ -62,6 +76,6 @@ if __name__ == "__main__":
 
     if key:
         print("✅ Instrument Key:", key)
-        print("📦 Trading Symbol:", instrument["trading_symbol"])
+        print("📦 Trading Symbol:", instrument.trading_symbol)
     else:
         print("❌ Instrument not found")
@@ -1,41 +1,69 @@
 import requests
 import re
 
-def get_option_id(USER_INPUT):
-    URL = (
-        "https://groww.in/v1/api/search/v3/query/global/st_p_query"
-        "?page=0"
-        "&size=6"
-        "&web=true"
-        f"&query={USER_INPUT.replace(' ', '%20')}"
-    )
+SEARCH_URL = "https://groww.in/v1/api/search/v3/query/global/st_p_query"
+
+HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "x-app-id": "growwWeb",
+    "x-device-id": "a2b9e7e0-4d46-5a74-9ed0-0dc94c62cdb9",
+    "x-device-type": "desktop",
+    "x-platform": "web"
+}
+
+# Bulk (per-expiry) search paging
+BULK_PAGE_SIZE = 50
+BULK_MAX_PAGES = 20
+
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9]+", "", text.lower())
 
-    HEADERS = {
-        "accept": "application/json, text/plain, */*",
-        "x-app-id": "growwWeb",
-        "x-device-id": "a2b9e7e0-4d46-5a74-9ed0-0dc94c62cdb9",
-        "x-device-type": "desktop",
-        "x-platform": "web"
-    }
 
-    def normalize(text):
-        return re.sub(r"[^a-z0-9]+", "", text.lower())
+def score(input_norm, candidate):
+    return score_norm(input_norm, normalize(candidate))
 
-    def score(input_norm, candidate):
-        c = normalize(candidate)
-        s = 0
-        if input_norm in c:
-            s += 100
-        if "call" in c and "ce" in input_norm:
-            s += 20
-        if "put" in c and "pe" in input_norm:
-            s += 20
-        return s
+
+def score_norm(input_norm, c):
+    """score() for an already normalized candidate."""
+    s = 0
+    if input_norm in c:
+        s += 100
+    if "call" in c and "ce" in input_norm:
+        s += 20
+    if "put" in c and "pe" in input_norm:
+        s += 20
+    return s
+
+
+def same_underlying(underlying_norm, *norms):
+    """
+    A normalized title or search_id must start with the underlying
+    followed by a digit, so NIFTY does not match FINNIFTY / MIDCPNIFTY.
+    """
+    for c in norms:
+        if c.startswith(underlying_norm) and c[len(underlying_norm):][:1].isdigit():
+            return True
+    return False
+
+
+def search_page(query, page=0, size=6):
+    URL = (
+        f"{SEARCH_URL}"
+        f"?page={page}"
+        f"&size={size}"
+        "&web=true"
+        f"&query={query.replace(' ', '%20')}"
+    )
 
     r = requests.get(URL, headers=HEADERS, timeout=10)
     r.raise_for_status()
 
-    results = r.json().get("data", {}).get("content", [])
+    return r.json().get("data", {}).get("content", [])
+
+
+def get_option_id(USER_INPUT):
+    results = search_page(USER_INPUT)
     if not results:
         return None
 
@@ -55,3 +83,84 @@ def get_option_id(USER_INPUT):
         "id": best.get("id"),
         "title": best.get("title")
     }
+
+
+def get_option_ids_bulk(prefix_query, trading_symbols,
+                        page_size=BULK_PAGE_SIZE, max_pages=BULK_MAX_PAGES):
+    """
+    Resolve every contract of one expiry with a few paged searches.
+
+    prefix_query example:
+    NIFTY 27 JAN 26
+
+    Returns {trading_symbol: {"id", "title"} | None}.
+    Symbols left as None were not found in the bulk pages;
+    callers fall back to get_option_id() for those.
+    """
+
+    # -----------------------------
+    # 📥 COLLECT ALL PAGES
+    # -----------------------------
+    items = []
+    seen = set()
+    for page in range(max_pages):
+        try:
+            results = search_page(prefix_query, page=page, size=page_size)
+        except Exception as e:
+            print(f"⚠️ Bulk search failed {prefix_query} page {page}: {e}")
+            break
+
+        fresh = [it for it in results if it.get("id") not in seen]
+        for it in fresh:
+            seen.add(it.get("id"))
+        items.extend(fresh)
+
+        if len(results) < page_size or not fresh:
+            break
+
+    # -----------------------------
+    # 🗂️ NORMALIZED TITLE → ITEM
+    # -----------------------------
+    # normalize every candidate once; the match loop only compares strings
+    index = {}
+    candidates = []
+    for it in items:
+        title_n = normalize(it.get("title") or "")
+        sid_n = normalize(it.get("search_id") or "")
+        for key in (title_n, sid_n):
+            if key:
+                index.setdefault(key, it)
+        candidates.append((it, title_n, sid_n, sid_n + title_n))
+
+    # -----------------------------
+    # 🎯 MATCH TRADING SYMBOLS
+    # -----------------------------
+    out = {}
+    by_underlying = {}  # underlying -> candidates passing same_underlying()
+    for ts in trading_symbols:
+        input_norm = normalize(ts)
+        best = index.get(input_norm)
+
+        if best is None:
+            underlying_norm = normalize(ts.split()[0])
+            pool = by_underlying.get(underlying_norm)
+            if pool is None:
+                pool = by_underlying[underlying_norm] = [
+                    (it, combined)
+                    for it, title_n, sid_n, combined in candidates
+                    if same_underlying(underlying_norm, title_n, sid_n)
+                ]
+
+            best_score = 0
+            for it, combined in pool:
+                sc = score_norm(input_norm, combined)
+                # only accept candidates that actually contain the symbol
+                if sc >= 100 and sc > best_score:
+                    best, best_score = it, sc
+
+        out[ts] = {
+            "id": best.get("id"),
+            "title": best.get("title")
+        } if best else None
+
+    return out
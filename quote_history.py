@@ -0,0 +1,415 @@
+import os
+import math
+from datetime import datetime, timedelta
+import pytz
+
+# ==========================================
+# CONFIG
+# ==========================================
+IST = pytz.timezone("Asia/Kolkata")
+
+# Production history lives in Mongo (MongoStore, see get_entry_point.py).
+# FileStore keeps the same frames on local disk for development / tests.
+HISTORY_DIR = os.getenv("QUOTE_HISTORY_DIR", "history")
+HISTORY_COLLECTION = "quote_history"
+
+# open / close / day_high / day_low, stored as integer paise
+FIELDS = ("open", "close", "day_high", "day_low")
+PRICE_SCALE = 100
+
+# ==========================================
+# FILE FORMAT
+# ==========================================
+# One "day stream" per (underlying, expiry, trade date) made of
+# append-only frames, one frame per chain snapshot:
+#
+#   varint  frame length (bytes after this field)
+#   varint  seconds since previous frame (first frame: epoch seconds)
+#   varint  new symbol count, then per symbol: varint len + utf-8 bytes
+#   varint  row count, then per row:
+#             varint  symbol index
+#             byte    presence mask (bit i -> FIELDS[i])
+#             zigzag varint per present field: delta vs the last stored
+#             value of that field for the same symbol
+#
+# A frame cut short by a crash (or one that fails to decode) ends the
+# readable stream; the next append drops everything after the last
+# good frame.
+#
+# FileStore:  <HISTORY_DIR>/<UNDERLYING>/<EXPIRY>/<YYYY-MM-DD>.qts
+# MongoStore: one document per day stream,
+#             {underlying, expiry_key, trade_date, frames: [bytes, ...],
+#              n_frames, updated_at}
+
+
+# ==========================================
+# VARINT HELPERS
+# ==========================================
+# Python ints are unbounded, so no fixed-width (n >> 63) trick here
+def zigzag(n: int) -> int:
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def unzigzag(n: int) -> int:
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+def write_varint(buf: bytearray, n: int):
+    while n > 0x7F:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def read_varint(data, pos: int):
+    shift = result = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+# ==========================================
+# STORES
+# ==========================================
+class FileStore:
+    """Day streams as local files (development / tests)."""
+
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir or HISTORY_DIR
+
+    @property
+    def name(self):
+        return f"file:{os.path.abspath(self.base_dir)}"
+
+    def path(self, key):
+        underlying, expiry_key, trade_date = key
+        return os.path.join(self.base_dir, underlying, expiry_key, f"{trade_date}.qts")
+
+    def read(self, key) -> bytes:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return b""
+        with open(path, "rb") as f:
+            return f.read()
+
+    def is_current(self, key, state) -> bool:
+        path = self.path(key)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        return size == state["end"]
+
+    def append(self, key, state, frame: bytes):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            # drop any torn / undecodable tail
+            f.seek(state["end"])
+            f.truncate()
+            f.write(frame)
+
+
+class MongoStore:
+    """Day streams as Mongo documents; each append is one atomic update."""
+
+    def __init__(self, collection):
+        self.col = collection
+        self.col.create_index(
+            [("underlying", 1), ("expiry_key", 1), ("trade_date", 1)], unique=True
+        )
+
+    @property
+    def name(self):
+        return f"mongo:{self.col.full_name}"
+
+    @staticmethod
+    def query(key):
+        underlying, expiry_key, trade_date = key
+        return {"underlying": underlying, "expiry_key": expiry_key, "trade_date": trade_date}
+
+    def read(self, key) -> bytes:
+        doc = self.col.find_one(self.query(key), {"frames": 1})
+        return b"".join(doc.get("frames", [])) if doc else b""
+
+    def is_current(self, key, state) -> bool:
+        doc = self.col.find_one(self.query(key), {"n_frames": 1})
+        return (doc.get("n_frames", 0) if doc else 0) == state["frames"]
+
+    def append(self, key, state, frame: bytes):
+        keep = state["frames"]
+        self.col.update_one(
+            self.query(key),
+            [{"$set": {
+                # keep the good frames, drop any undecodable tail, add ours
+                "frames": {"$concatArrays": [
+                    {"$slice": [{"$ifNull": ["$frames", []]}, keep]},
+                    {"$literal": [frame]},
+                ]},
+                "n_frames": keep + 1,
+                "updated_at": datetime.now(IST),
+            }}],
+            upsert=True,
+        )
+
+
+def default_store():
+    return FileStore()
+
+
+def new_state():
+    return {"ts": 0, "symbols": [], "index": {}, "last": [], "end": 0, "frames": 0}
+
+
+def as_ist(value: datetime) -> datetime:
+    # naive datetimes are IST wall-clock times, like the rest of the pipeline
+    if value.tzinfo is None:
+        return IST.localize(value)
+    return value.astimezone(IST)
+
+
+# ==========================================
+# DECODE
+# ==========================================
+def iter_frames(data: bytes, state: dict):
+    """
+    Yields (epoch_seconds, [(symbol, [open, close, high, low]), ...]).
+    Prices are in paise, None when missing. `state` is advanced only
+    after a frame decodes cleanly; `state["end"]` / `state["frames"]`
+    mark the byte offset / count of good frames.
+    """
+    pos = 0
+    state["end"] = 0
+    state["frames"] = 0
+
+    while pos < len(data):
+        try:
+            length, body = read_varint(data, pos)
+            end = body + length
+            if end > len(data):
+                break
+            frame = data[body:end]
+
+            p = 0
+            delta, p = read_varint(frame, p)
+            ts = state["ts"] + delta
+
+            # decode into temporaries, commit to state at the end
+            new_syms = []
+            n_new, p = read_varint(frame, p)
+            for _ in range(n_new):
+                size, p = read_varint(frame, p)
+                if p + size > len(frame):
+                    raise IndexError("symbol past frame end")
+                new_syms.append(frame[p:p + size].decode("utf-8"))
+                p += size
+            symbols = state["symbols"] + new_syms if new_syms else state["symbols"]
+
+            updates = {}
+            n_rows, p = read_varint(frame, p)
+            rows = []
+            for _ in range(n_rows):
+                idx, p = read_varint(frame, p)
+                mask = frame[p]
+                p += 1
+                if idx >= len(symbols):
+                    raise IndexError("unknown symbol index")
+                if idx not in updates:
+                    updates[idx] = (
+                        list(state["last"][idx]) if idx < len(state["last"])
+                        else [0] * len(FIELDS)
+                    )
+                last = updates[idx]
+                values = [None] * len(FIELDS)
+                for f in range(len(FIELDS)):
+                    if mask & (1 << f):
+                        d, p = read_varint(frame, p)
+                        last[f] += unzigzag(d)
+                        values[f] = last[f]
+                rows.append((symbols[idx], values))
+            if p != len(frame):
+                raise IndexError("trailing bytes in frame")
+        except (IndexError, UnicodeDecodeError):
+            break
+
+        for sym in new_syms:
+            state["index"][sym] = len(state["symbols"])
+            state["symbols"].append(sym)
+            state["last"].append([0] * len(FIELDS))
+        for idx, last in updates.items():
+            state["last"][idx] = last
+        state["ts"] = ts
+        state["end"] = end
+        state["frames"] += 1
+        pos = end
+        yield ts, rows
+
+
+def load_state(store, key) -> dict:
+    state = new_state()
+    for _ in iter_frames(store.read(key), state):
+        pass
+    return state
+
+
+# (store, day stream) -> writer state, so appends don't re-decode the day
+STATE_CACHE = {}
+
+
+def writer_state(store, key) -> dict:
+    state = STATE_CACHE.get((store.name, key))
+    # reload if the stream changed behind our back (or on first use)
+    if state is None or not store.is_current(key, state):
+        state = load_state(store, key)
+        STATE_CACHE[(store.name, key)] = state
+    return state
+
+
+# ==========================================
+# ENCODE
+# ==========================================
+def encode_frame(state: dict, ts: int, rows) -> bytes:
+    """rows: iterable of (symbol, [open, close, high, low]) in paise / None"""
+    new_syms = bytearray()
+    n_new = 0
+    body = bytearray()
+    n_rows = 0
+
+    for sym, values in rows:
+        idx = state["index"].get(sym)
+        if idx is None:
+            idx = len(state["symbols"])
+            state["index"][sym] = idx
+            state["symbols"].append(sym)
+            state["last"].append([0] * len(FIELDS))
+            raw = sym.encode("utf-8")
+            write_varint(new_syms, len(raw))
+            new_syms += raw
+            n_new += 1
+
+        last = state["last"][idx]
+        mask = 0
+        deltas = bytearray()
+        for f, v in enumerate(values):
+            if v is None:
+                continue
+            mask |= 1 << f
+            write_varint(deltas, zigzag(v - last[f]))
+            last[f] = v
+
+        write_varint(body, idx)
+        body.append(mask)
+        body += deltas
+        n_rows += 1
+
+    frame = bytearray()
+    write_varint(frame, ts - state["ts"])
+    write_varint(frame, n_new)
+    frame += new_syms
+    write_varint(frame, n_rows)
+    frame += body
+    state["ts"] = ts
+
+    out = bytearray()
+    write_varint(out, len(frame))
+    out += frame
+    return bytes(out)
+
+
+def to_paise(price):
+    # None, NaN (compact chain) and +/-inf all mean "missing"
+    if price is None or not math.isfinite(price):
+        return None
+    return int(round(price * PRICE_SCALE))
+
+
+# ==========================================
+# APPEND
+# ==========================================
+def append_snapshot(underlying: str, expiry_key: str, chain, at: datetime = None,
+                    store=None):
+    """
+    Append one snapshot of a ContractChain for (underlying, expiry).
+    """
+    store = store or default_store()
+    at = as_ist(at or datetime.now(IST))
+    ts = int(at.timestamp())
+    key = (underlying, expiry_key, at.strftime("%Y-%m-%d"))
+
+    state = writer_state(store, key)
+    if ts < state["ts"]:
+        raise ValueError(f"Snapshot older than last frame: {key}")
+
+    rows = [
+        (
+            chain.trading_symbols[i],
+            [
+                to_paise(chain.opens[i]),
+                to_paise(chain.closes[i]),
+                to_paise(chain.day_highs[i]),
+                to_paise(chain.day_lows[i]),
+            ],
+        )
+        for i in range(len(chain))
+        if chain.trading_symbols[i]
+    ]
+    # encode on a copy so a failed write leaves the cached state intact
+    new = {
+        "ts": state["ts"],
+        "symbols": list(state["symbols"]),
+        "index": dict(state["index"]),
+        "last": [list(v) for v in state["last"]],
+    }
+    frame = encode_frame(new, ts, rows)
+
+    try:
+        store.append(key, state, frame)
+    except Exception:
+        STATE_CACHE.pop((store.name, key), None)
+        raise
+
+    new["end"] = state["end"] + len(frame)
+    new["frames"] = state["frames"] + 1
+    STATE_CACHE[(store.name, key)] = new
+    return len(frame)
+
+
+# ==========================================
+# RANGE QUERY
+# ==========================================
+def query_quotes(underlying: str, expiry_key: str, start: datetime, end: datetime,
+                 symbols=None, store=None) -> list:
+    """
+    All stored quotes for (underlying, expiry) with start <= time <= end,
+    oldest first. Naive datetimes are taken as IST. `symbols`
+    optionally limits to some trading symbols.
+    """
+    store = store or default_store()
+    start, end = as_ist(start), as_ist(end)
+    lo, hi = int(start.timestamp()), int(end.timestamp())
+    wanted = set(symbols) if symbols is not None else None
+
+    out = []
+    day = start.date()
+    while day <= end.date():
+        data = store.read((underlying, expiry_key, day.strftime("%Y-%m-%d")))
+        day += timedelta(days=1)
+        if not data:
+            continue
+
+        for ts, rows in iter_frames(data, new_state()):
+            if ts > hi:
+                break
+            if ts < lo:
+                continue
+            when = datetime.fromtimestamp(ts, IST)
+            for sym, values in rows:
+                if wanted is not None and sym not in wanted:
+                    continue
+                rec = {"time": when, "trading_symbol": sym}
+                for f, v in zip(FIELDS, values):
+                    rec[f] = None if v is None else v / PRICE_SCALE
+                out.append(rec)
+
+    return out
@@ -0,0 +1,202 @@
+import sys
+from array import array
+
+# ==========================================
+# COMPACT RECORD TYPES
+# ==========================================
+# Instruments and chain results are kept in slotted / array-backed
+# form in memory and only turned back into plain dicts at the Mongo
+# boundary (ContractChain.to_dicts()).
+
+NAN = float("nan")
+
+OPTION_TYPES = ("CE", "PE")
+PRICE_FIELDS = ("open", "close", "day_high", "day_low")
+
+
+def intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def pack_token(value):
+    """
+    Exchange tokens are numeric strings -> (int, True) when the string
+    round-trips exactly ("0123" stays a string); anything else is
+    returned unchanged as (value, False).
+    """
+    if (
+        isinstance(value, str) and value.isascii() and value.isdigit()
+        and str(int(value)) == value
+    ):
+        return int(value), True
+    return value, False
+
+
+def unpack_token(value, packed):
+    return str(value) if packed else value
+
+
+def is_plain_price(value):
+    """int / float that a float array holds without loss (NaN excluded)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return value == value and float(value) == value
+
+
+# ==========================================
+# UPSTOX SYMBOL MAP ENTRY
+# ==========================================
+class InstrumentRef:
+    __slots__ = ("instrument_key", "token", "token_packed")
+
+    def __init__(self, instrument_key, exchange_token):
+        self.instrument_key = intern_str(instrument_key)
+        self.token, self.token_packed = pack_token(exchange_token)
+
+    @property
+    def exchange_token(self):
+        """Token exactly as the instrument master supplied it."""
+        return unpack_token(self.token, self.token_packed)
+
+
+# ==========================================
+# OPTION INSTRUMENT ROW (MASTER FILE)
+# ==========================================
+class OptionInstrument:
+    __slots__ = (
+        "instrument_key",
+        "trading_symbol",
+        "underlying_symbol",
+        "instrument_type",
+        "strike_price",
+        "expiry",
+    )
+
+    def __init__(self, instrument_key, trading_symbol, underlying_symbol,
+                 instrument_type, strike_price, expiry):
+        self.instrument_key = intern_str(instrument_key)
+        self.trading_symbol = intern_str(trading_symbol)
+        self.underlying_symbol = intern_str(underlying_symbol)
+        self.instrument_type = intern_str(instrument_type)
+        self.strike_price = float(strike_price)
+        self.expiry = int(expiry)
+
+    @classmethod
+    def from_row(cls, row: dict):
+        """Returns None for non-option / malformed rows."""
+        if row.get("instrument_type") not in OPTION_TYPES:
+            return None
+        try:
+            return cls(
+                row["instrument_key"],
+                row.get("trading_symbol"),
+                row.get("underlying_symbol"),
+                row["instrument_type"],
+                row.get("strike_price", -1),
+                row.get("expiry", 0),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+# ==========================================
+# CHAIN RESULTS (ONE EXPIRY, COLUMNAR)
+# ==========================================
+class ContractChain:
+    """
+    Column store for build_symbols() output.
+    Strings are interned, option type / market flag are bytes,
+    prices live in float arrays (NaN == missing) with a per-row bit
+    mask remembering which prices were ints. Anything a float array
+    cannot hold exactly is kept as-is in the sparse `odd_prices`.
+    """
+
+    __slots__ = (
+        "ids", "titles", "trading_symbols", "instrument_keys",
+        "exchange_tokens", "option_types", "market_open",
+        "opens", "closes", "day_highs", "day_lows",
+        "int_prices", "odd_prices", "packed_tokens",
+    )
+
+    def __init__(self):
+        self.ids = []
+        self.titles = []
+        self.trading_symbols = []
+        self.instrument_keys = []
+        self.exchange_tokens = []
+        self.option_types = array("b")
+        self.market_open = array("b")
+        self.opens = array("d")
+        self.closes = array("d")
+        self.day_highs = array("d")
+        self.day_lows = array("d")
+        self.int_prices = array("b")
+        self.odd_prices = {}
+        self.packed_tokens = array("b")
+
+    def __len__(self):
+        return len(self.trading_symbols)
+
+    def append(self, *, id, title, trading_symbol, option_type,
+               open, close, day_high, day_low, market_open,
+               instrument_key, exchange_token):
+        # convert first so a bad value cannot leave columns uneven
+        opt_idx = OPTION_TYPES.index(option_type)
+        row = len(self)
+        prices = []
+        int_mask = 0
+        for f, value in enumerate((open, close, day_high, day_low)):
+            if value is None:
+                prices.append(NAN)
+            elif is_plain_price(value):
+                prices.append(float(value))
+                if isinstance(value, int):
+                    int_mask |= 1 << f
+            else:
+                prices.append(NAN)
+                self.odd_prices[(row, f)] = value
+
+        self.ids.append(intern_str(id))
+        self.titles.append(intern_str(title))
+        self.trading_symbols.append(intern_str(trading_symbol))
+        self.instrument_keys.append(intern_str(instrument_key))
+        token, packed = pack_token(exchange_token)
+        self.exchange_tokens.append(token)
+        self.packed_tokens.append(1 if packed else 0)
+        self.option_types.append(opt_idx)
+        self.market_open.append(1 if market_open else 0)
+        self.opens.append(prices[0])
+        self.closes.append(prices[1])
+        self.day_highs.append(prices[2])
+        self.day_lows.append(prices[3])
+        self.int_prices.append(int_mask)
+
+    def price(self, i, f):
+        """Original value of PRICE_FIELDS[f] for row i."""
+        if (i, f) in self.odd_prices:
+            return self.odd_prices[(i, f)]
+        value = (self.opens, self.closes, self.day_highs, self.day_lows)[f][i]
+        if value != value:
+            return None
+        return int(value) if self.int_prices[i] & (1 << f) else value
+
+    def to_dicts(self):
+        """Mongo boundary: same dict shape build_symbols() always stored."""
+        return [
+            {
+                "id": self.ids[i],
+                "open": self.price(i, 0),
+                "close": self.price(i, 1),
+                "title": self.titles[i],
+                "trading_symbol": self.trading_symbols[i],
+                "option_type": OPTION_TYPES[self.option_types[i]],
+                "day_high": self.price(i, 2),
+                "day_low": self.price(i, 3),
+                "market_open": bool(self.market_open[i]),
+                "instrument_key": self.instrument_keys[i],
+                "exchange_token": unpack_token(
+                    self.exchange_tokens[i], self.packed_tokens[i]
+                ),
+            }
+            for i in range(len(self))
+        ]
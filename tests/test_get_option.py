@@ -0,0 +1,82 @@
+import pytest
+
+import get_option
+
+TS = "NIFTY 26000 CE 27 JAN 26"
+QUERY = "NIFTY 27 JAN 26"
+
+
+def item(id, title, search_id=""):
+    return {"id": id, "title": title, "search_id": search_id}
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """Serve search_page() from a list of pages and record the calls."""
+    served = {"pages": [], "calls": []}
+
+    def fake_search_page(query, page=0, size=6):
+        served["calls"].append((query, page, size))
+        if page < len(served["pages"]):
+            return served["pages"][page]
+        return []
+
+    monkeypatch.setattr(get_option, "search_page", fake_search_page)
+    return served
+
+
+def test_stops_on_short_page(pages):
+    pages["pages"] = [
+        [item("A", "NIFTY 26000 CE 27 JAN 26"), item("B", "NIFTY 26000 PE 27 JAN 26")],
+        [item("C", "NIFTY 26050 CE 27 JAN 26")],
+        [item("D", "NIFTY 26050 PE 27 JAN 26")],
+    ]
+    out = get_option.get_option_ids_bulk(QUERY, ["NIFTY 26050 PE 27 JAN 26"], page_size=2)
+    assert [c[1] for c in pages["calls"]] == [0, 1]
+    assert out == {"NIFTY 26050 PE 27 JAN 26": None}
+
+
+def test_stops_on_repeated_page(pages):
+    same = [item("A", "NIFTY 26000 CE 27 JAN 26"), item("B", "NIFTY 26000 PE 27 JAN 26")]
+    pages["pages"] = [same, same, same, same]
+    out = get_option.get_option_ids_bulk(QUERY, [TS], page_size=2)
+    assert [c[1] for c in pages["calls"]] == [0, 1]
+    assert out[TS]["id"] == "A"
+
+
+def test_exact_title_and_search_id_match(pages):
+    pages["pages"] = [[
+        item("BY_TITLE", "Nifty 26000 CE 27 Jan 26"),
+        item("BY_SID", "something else", "nifty-26000-pe-27-jan-26"),
+    ]]
+    out = get_option.get_option_ids_bulk(QUERY, [TS, "NIFTY 26000 PE 27 JAN 26"])
+    assert out[TS] == {"id": "BY_TITLE", "title": "Nifty 26000 CE 27 Jan 26"}
+    assert out["NIFTY 26000 PE 27 JAN 26"]["id"] == "BY_SID"
+
+
+def test_fuzzy_match_is_pinned_to_underlying(pages):
+    pages["pages"] = [[
+        item("FINNIFTY26JAN26000CE", "FINNIFTY 26000 CE 27 JAN 26 Call", "finnifty26000ce27jan26"),
+        item("MIDCPNIFTY26JAN26000CE", "MIDCPNIFTY 26000 CE 27 JAN 26 Call"),
+        item("NIFTY26JAN26000CE", "NIFTY 26000 CE 27 JAN 26 Call"),
+    ]]
+    out = get_option.get_option_ids_bulk(QUERY, [TS])
+    assert out[TS]["id"] == "NIFTY26JAN26000CE"
+
+
+def test_other_underlying_only_is_a_miss(pages):
+    pages["pages"] = [[
+        item("FINNIFTY26JAN26000CE", "FINNIFTY 26000 CE 27 JAN 26 Call", "finnifty26000ce27jan26"),
+    ]]
+    assert get_option.get_option_ids_bulk(QUERY, [TS]) == {TS: None}
+
+
+def test_miss_and_search_failure_return_none(pages, monkeypatch):
+    pages["pages"] = [[item("X", "NIFTY 25000 CE 27 JAN 26")]]
+    assert get_option.get_option_ids_bulk(QUERY, [TS]) == {TS: None}
+
+    def boom(query, page=0, size=6):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(get_option, "search_page", boom)
+    assert get_option.get_option_ids_bulk(QUERY, [TS]) == {TS: None}
@@ -0,0 +1,150 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import quote_history
+from records import ContractChain
+
+EXPIRY = "2026-01-27"
+DAY_KEY = ("NIFTY", EXPIRY, "2026-01-20")
+BASE = datetime(2026, 1, 20, 9, 15)  # naive == IST
+
+
+@pytest.fixture(autouse=True)
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(quote_history, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(quote_history, "STATE_CACHE", {})
+    return tmp_path
+
+
+def make_chain(prices):
+    chain = ContractChain()
+    for ts, (o, c, h, l) in prices.items():
+        chain.append(
+            id=None, title=None, trading_symbol=ts, option_type=ts.split()[2],
+            open=o, close=c, day_high=h, day_low=l, market_open=True,
+            instrument_key=None, exchange_token=None,
+        )
+    return chain
+
+
+SNAPSHOTS = [
+    {"NIFTY 26000 CE 27 JAN 26": (120.5, 118, 125.25, 110.05),
+     "NIFTY 26000 PE 27 JAN 26": (80.1, None, 90, 75.5)},
+    {"NIFTY 26000 CE 27 JAN 26": (99.95, 130.4, 131, 98),
+     "NIFTY 26050 CE 27 JAN 26": (60, 61.5, None, None)},
+    {"NIFTY 26000 PE 27 JAN 26": (81, 70.35, 92.2, 69.9)},
+]
+
+
+def write_all():
+    for m, snap in enumerate(SNAPSHOTS):
+        quote_history.append_snapshot("NIFTY", EXPIRY, make_chain(snap),
+                                      BASE + timedelta(minutes=m))
+
+
+def expected(minutes):
+    out = []
+    for m in minutes:
+        for ts, values in SNAPSHOTS[m].items():
+            out.append((BASE + timedelta(minutes=m), ts, list(values)))
+    return out
+
+
+def as_tuples(rows):
+    return [
+        (r["time"].replace(tzinfo=None), r["trading_symbol"],
+         [r[f] for f in quote_history.FIELDS])
+        for r in rows
+    ]
+
+
+def test_round_trip_and_time_window():
+    write_all()
+
+    rows = quote_history.query_quotes("NIFTY", EXPIRY, BASE, BASE + timedelta(minutes=5))
+    assert as_tuples(rows) == expected([0, 1, 2])
+
+    rows = quote_history.query_quotes(
+        "NIFTY", EXPIRY, BASE + timedelta(minutes=1), BASE + timedelta(minutes=1)
+    )
+    assert as_tuples(rows) == expected([1])
+
+
+def test_symbol_filter():
+    write_all()
+    rows = quote_history.query_quotes(
+        "NIFTY", EXPIRY, BASE, BASE + timedelta(minutes=5),
+        symbols=["NIFTY 26000 PE 27 JAN 26"],
+    )
+    assert [r["trading_symbol"] for r in rows] == ["NIFTY 26000 PE 27 JAN 26"] * 2
+
+
+def test_empty_symbol_filter_returns_nothing():
+    write_all()
+    rows = quote_history.query_quotes(
+        "NIFTY", EXPIRY, BASE, BASE + timedelta(minutes=5), symbols=[]
+    )
+    assert rows == []
+
+
+@pytest.mark.parametrize("n", [0, 1, -1, 63, -64, 2**63, -(2**63) - 1, 10**40, -(10**40)])
+def test_zigzag_round_trip(n):
+    assert quote_history.zigzag(n) >= 0
+    assert quote_history.unzigzag(quote_history.zigzag(n)) == n
+
+
+def test_huge_and_non_finite_prices():
+    snap = {"NIFTY 26000 CE 27 JAN 26": (1e30, float("inf"), float("-inf"), 10.5)}
+    quote_history.append_snapshot("NIFTY", EXPIRY, make_chain(snap), BASE)
+
+    rows = quote_history.query_quotes("NIFTY", EXPIRY, BASE, BASE)
+    assert [[r[f] for f in quote_history.FIELDS] for r in rows] == [[1e30, None, None, 10.5]]
+
+
+def test_torn_tail_is_skipped_and_truncated():
+    quote_history.append_snapshot("NIFTY", EXPIRY, make_chain(SNAPSHOTS[0]), BASE)
+    path = quote_history.FileStore().path(DAY_KEY)
+    with open(path, "ab") as f:
+        f.write(b"\x50\x01\x02")  # claims 80 bytes, has 2
+
+    rows = quote_history.query_quotes("NIFTY", EXPIRY, BASE, BASE + timedelta(minutes=5))
+    assert as_tuples(rows) == expected([0])
+
+    for m in (1, 2):
+        quote_history.append_snapshot("NIFTY", EXPIRY, make_chain(SNAPSHOTS[m]),
+                                      BASE + timedelta(minutes=m))
+    rows = quote_history.query_quotes("NIFTY", EXPIRY, BASE, BASE + timedelta(minutes=5))
+    assert as_tuples(rows) == expected([0, 1, 2])
+
+
+def test_corrupt_frame_does_not_leak_into_state():
+    quote_history.append_snapshot("NIFTY", EXPIRY, make_chain(SNAPSHOTS[0]), BASE)
+    path = quote_history.FileStore().path(DAY_KEY)
+    good_size = os.path.getsize(path)
+
+    # complete-length frame: 1 new symbol with invalid utf-8, then junk
+    frame = b"\x3c\x01\x02\xff\xfe\x01\x02"
+    with open(path, "ab") as f:
+        f.write(bytes([len(frame)]) + frame)
+
+    state = quote_history.load_state(quote_history.FileStore(), DAY_KEY)
+    assert state["end"] == good_size
+    assert len(state["symbols"]) == 2
+    assert state["frames"] == 1
+
+    quote_history.STATE_CACHE.clear()
+    quote_history.append_snapshot("NIFTY", EXPIRY, make_chain(SNAPSHOTS[1]),
+                                  BASE + timedelta(minutes=1))
+    rows = quote_history.query_quotes("NIFTY", EXPIRY, BASE, BASE + timedelta(minutes=5))
+    assert as_tuples(rows) == expected([0, 1])
+
+
+def test_aware_and_naive_windows_agree():
+    write_all()
+    naive = quote_history.query_quotes("NIFTY", EXPIRY, BASE, BASE)
+    aware = quote_history.query_quotes(
+        "NIFTY", EXPIRY, quote_history.IST.localize(BASE), quote_history.IST.localize(BASE)
+    )
+    assert as_tuples(naive) == as_tuples(aware) == expected([0])
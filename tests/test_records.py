@@ -0,0 +1,55 @@
+import math
+
+from records import ContractChain, InstrumentRef, pack_token
+
+HUGE = 2**60 + 1  # not representable as a float
+
+
+def append(chain, open, close, day_high, day_low, exchange_token="35001"):
+    chain.append(
+        id="ID", title="T", trading_symbol="NIFTY 26000 CE 27 JAN 26",
+        option_type="CE", open=open, close=close, day_high=day_high,
+        day_low=day_low, market_open=True, instrument_key="NSE_FO|35001",
+        exchange_token=exchange_token,
+    )
+
+
+def test_to_dicts_round_trip_keeps_values_and_types():
+    rows = [
+        ((100, 99.5, None, 7), "35001"),
+        ((True, "n/a", HUGE, 0), "0123"),
+        ((1.25, 0.0, -3, 2.5), 35001),
+        ((None, None, None, None), None),
+    ]
+    chain = ContractChain()
+    for prices, token in rows:
+        append(chain, *prices, exchange_token=token)
+
+    out = chain.to_dicts()
+    assert len(out) == len(rows)
+    for d, (prices, token) in zip(out, rows):
+        got = (d["open"], d["close"], d["day_high"], d["day_low"])
+        assert got == prices
+        assert [type(v) for v in got] == [type(v) for v in prices]
+        assert d["exchange_token"] == token
+        assert type(d["exchange_token"]) is type(token)
+
+
+def test_nan_price_reads_back_as_nan():
+    chain = ContractChain()
+    append(chain, float("nan"), 1, 2, 3)
+    assert math.isnan(chain.to_dicts()[0]["open"])
+
+
+def test_pack_token():
+    assert pack_token("35001") == (35001, True)
+    assert pack_token("0123") == ("0123", False)
+    assert pack_token("²") == ("²", False)
+    assert pack_token(35001) == (35001, False)
+    assert pack_token(None) == (None, False)
+
+
+def test_instrument_ref_returns_original_token():
+    assert InstrumentRef("k", "35001").exchange_token == "35001"
+    assert InstrumentRef("k", "0123").exchange_token == "0123"
+    assert InstrumentRef("k", 35001).exchange_token == 35001